@@ -1,13 +1,27 @@
 import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Literal, Dict, Any, List, Optional
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
+from typing import Literal, Dict, Any, List, Optional, Tuple
 
 from database import db, create_document
-from schemas import Player, GameResult, BlackjackHand
+from schemas import Player, BlackjackHand
 
-app = FastAPI(title="Fun Casino API", description="Play-for-fun casino games. No real money.")
+app = FastAPI(
+    title="Fun Casino API",
+    description="Play-for-fun casino games. No real money.",
+    default_response_class=ORJSONResponse,
+)
+
+logger = logging.getLogger(__name__)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,27 +31,152 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Utility functions
+# Collection handles, bound once at startup
+PLAYERS = None
+GAMERESULTS = None
+HANDS = None
 
-def collection(name: str):
+@app.on_event("startup")
+async def bind_collections():
+    global PLAYERS, GAMERESULTS, HANDS
+    if db is None:
+        return
+    PLAYERS = db["player"]
+    GAMERESULTS = db["gameresult"]
+    HANDS = db["blackjackhand"]
+
+# Indexes are built in the background, retried until they all exist
+
+INDEX_RETRY_SECONDS = 30
+
+# set once the unique player.username index exists; until then registration checks for taken names itself
+_username_index_ready = False
+_index_builder: Optional[asyncio.Task] = None
+
+
+async def ensure_indexes():
+    """Create the indexes, retrying every INDEX_RETRY_SECONDS until all of them exist"""
+    global _username_index_ready
+    pending = [
+        # registration relies on this to reject taken usernames
+        (PLAYERS, "username", {"unique": True}),
+        # only active hands are looked up by user, so index just those
+        (HANDS, [("username", 1), ("status", 1)], {"partialFilterExpression": {"status": "player_turn"}}),
+        # newest-first history per player, served straight from the index
+        (GAMERESULTS, [("username", 1), ("created_at", -1)], {}),
+    ]
+    while True:
+        failed = []
+        for i, (col, keys, options) in enumerate(pending):
+            try:
+                await col.create_index(keys, **options)
+            except ConnectionFailure:
+                # server unreachable: don't wait out the selection timeout for every index
+                logger.exception("Database unreachable, retrying index creation in %ds", INDEX_RETRY_SECONDS)
+                failed.extend(pending[i:])
+                break
+            except PyMongoError:
+                # e.g. duplicate usernames left over from before the unique index
+                logger.exception("Failed to create index %s on %s", keys, col.name)
+                failed.append((col, keys, options))
+            else:
+                if col is PLAYERS:
+                    _username_index_ready = True
+        pending = failed
+        if not pending:
+            return
+        await asyncio.sleep(INDEX_RETRY_SECONDS)
+
+
+@app.on_event("startup")
+async def start_index_builder():
+    global _index_builder
     if db is None:
-        raise HTTPException(status_code=500, detail="Database not available")
-    return db[name]
+        return
+    # don't hold up startup on the database; /test reports its status
+    _index_builder = asyncio.create_task(ensure_indexes())
+
+
+@app.on_event("shutdown")
+async def stop_index_builder():
+    if _index_builder is not None:
+        _index_builder.cancel()
+
+# Game results are written off the request path, batched by a single writer task
+
+RESULT_BATCH_SIZE = 100
+RESULT_FLUSH_SECONDS = 0.05
+
+_result_queue: Optional[asyncio.Queue] = None
+_result_writer: Optional[asyncio.Task] = None
+
+
+async def write_game_results(queue: asyncio.Queue):
+    """Drain queued game results with insert_many, up to RESULT_BATCH_SIZE docs or RESULT_FLUSH_SECONDS per batch"""
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        doc = await queue.get()
+        if doc is None:
+            break
+        batch = [doc]
+        deadline = loop.time() + RESULT_FLUSH_SECONDS
+        while len(batch) < RESULT_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                doc = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if doc is None:
+                # shutdown: flush what we have, then stop
+                done = True
+                break
+            batch.append(doc)
+        try:
+            await GAMERESULTS.insert_many(batch, ordered=False)
+        except Exception:
+            logger.exception("Failed to record %d game results", len(batch))
+
+
+@app.on_event("startup")
+async def start_result_writer():
+    global _result_queue, _result_writer
+    if db is None:
+        return
+    _result_queue = asyncio.Queue(maxsize=10000)
+    _result_writer = asyncio.create_task(write_game_results(_result_queue))
+
+
+@app.on_event("shutdown")
+async def stop_result_writer():
+    if _result_writer is None:
+        return
+    # sentinel goes behind any queued results, so they are flushed first
+    await _result_queue.put(None)
+    await _result_writer
 
 # Request models
 
 class BetRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str = Field(..., min_length=3, max_length=24)
     bet: int = Field(..., ge=1, le=1000)
 
 # Public endpoints
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Fun Casino API running"}
 
+# Last successful collection listing for /test, so frequent probes don't each hit the server
+TEST_CACHE_SECONDS = 10
+_TEST_CACHE: Dict[str, Any] = {"ts": None, "collections": []}
+
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -54,8 +193,10 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
-                response["collections"] = collections[:10]
+                if _TEST_CACHE["ts"] is None or time.monotonic() - _TEST_CACHE["ts"] > TEST_CACHE_SECONDS:
+                    _TEST_CACHE["collections"] = await db.list_collection_names()
+                    _TEST_CACHE["ts"] = time.monotonic()
+                response["collections"] = _TEST_CACHE["collections"][:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -71,42 +212,84 @@ def test_database():
 # Player endpoints
 
 @app.post("/api/player/register")
-def register_player(player: Player):
-    col = collection("player")
-    existing = col.find_one({"username": player.username})
-    if existing:
+async def register_player(player: Player):
+    if not _username_index_ready and await PLAYERS.find_one({"username": player.username}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Username already taken")
+    try:
+        player_id = await create_document("player", player)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Username already taken")
-    player_id = create_document("player", player)
+    _balance_cache[player.username] = player.balance
     return {"ok": True, "id": player_id, "username": player.username, "balance": player.balance}
 
 @app.get("/api/player/{username}")
-def get_player(username: str):
-    col = collection("player")
-    doc = col.find_one({"username": username})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Player not found")
-    return {"username": doc["username"], "balance": int(doc.get("balance", 0))}
+async def get_player(username: str):
+    return {"username": username, "balance": await get_balance(username)}
 
 # Helpers
 
-def get_balance(username: str) -> int:
-    col = collection("player")
-    doc = col.find_one({"username": username})
+# Recently read/written balances. Balance writes in this process refresh it;
+# checks that must be exact go through adjust_balance's conditional update instead.
+_balance_cache: TTLCache = TTLCache(maxsize=10000, ttl=2)
+
+async def get_balance(username: str) -> int:
+    balance = _balance_cache.get(username)
+    if balance is not None:
+        return balance
+    doc = await PLAYERS.find_one({"username": username}, {"balance": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Player not found")
-    return int(doc.get("balance", 0))
-
-def adjust_balance(username: str, delta: int) -> int:
-    col = collection("player")
-    doc = col.find_one({"username": username})
+    # a balance write that landed during the await is newer than this read, keep it
+    return _balance_cache.setdefault(username, int(doc.get("balance", 0)))
+
+async def adjust_balance(username: str, delta: int, min_balance: int = 0) -> int:
+    """Atomically apply delta (clamped at 0), optionally requiring balance >= min_balance first"""
+    query: Dict[str, Any] = {"username": username}
+    if min_balance > 0:
+        query["balance"] = {"$gte": min_balance}
+    doc = await PLAYERS.find_one_and_update(
+        query,
+        [{"$set": {"balance": {"$max": [0, {"$add": [{"$ifNull": ["$balance", 0]}, delta]}]}}}],
+        projection={"balance": 1},
+        return_document=ReturnDocument.AFTER,
+    )
     if not doc:
+        if min_balance > 0 and await PLAYERS.find_one({"username": username}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Insufficient balance")
         raise HTTPException(status_code=404, detail="Player not found")
-    new_balance = max(0, int(doc.get("balance", 0)) + delta)
-    col.update_one({"_id": doc["_id"]}, {"$set": {"balance": new_balance}})
+    balance = _balance_cache[username] = int(doc["balance"])
+    return balance
+
+async def finalize_game(username: str, game: str, bet: int, payout: int, details: Dict[str, Any],
+                        min_balance: int = 0, resolve_hand: bool = False) -> int:
+    """Settle a bet and record it; returns the new balance"""
+    # balance_after comes from the update, so the settlement must land first
+    new_balance = await adjust_balance(username, payout, min_balance=min_balance)
+    # every field here is server-built, so queue the GameResult shape directly without validating
+    now = datetime.now(timezone.utc)
+    # the player only waits for the settlement; history is recorded by the writer task
+    await _result_queue.put({
+        "username": username,
+        "game": game,
+        "bet": bet,
+        "payout": payout,
+        "balance_after": new_balance,
+        "details": details,
+        "created_at": now,
+        "updated_at": now,
+    })
+    if resolve_hand:
+        # mark hand resolved
+        await HANDS.update_many({"username": username}, {"$set": {"status": "resolved"}})
     return new_balance
 
 # Game logic
 import random
+import secrets
+import itertools
+
+# game RNG; endpoints are async, so it is only ever used from the event loop thread
+_RNG = random.Random()
 
 # ----- Blackjack with player actions -----
 
@@ -115,54 +298,70 @@ SUITS = ["♠","♥","♦","♣"]
 
 CARD_VALUES = {"A": 11, "2": 2, "3": 3, "4": 4, "5": 5, "6": 6, "7": 7, "8": 8, "9": 9, "10": 10, "J": 10, "Q": 10, "K": 10}
 
+# full card string -> value, so hands are scored without slicing off the suit
+CARD_TO_VALUE = {f"{r}{s}": CARD_VALUES[r] for r in RANKS for s in SUITS}
+IS_ACE = {f"A{s}" for s in SUITS}
+
+# shoes hold card indexes into these tables; strings are only built when a card is drawn
+CARDS_INT = list(range(len(RANKS) * len(SUITS)))
+INT_TO_CARD = [f"{r}{s}" for r in RANKS for s in SUITS]
+
 
 def hand_value(cards: List[str]) -> int:
-    total = 0
-    aces = 0
-    for c in cards:
-        r = c[:-1]
-        total += CARD_VALUES[r]
-        if r == "A":
-            aces += 1
+    total = sum(CARD_TO_VALUE[c] for c in cards)
+    aces = sum(1 for c in cards if c in IS_ACE)
     while total > 21 and aces:
         total -= 10
         aces -= 1
     return total
 
 
-def make_shoe(decks: int = 6) -> List[str]:
-    shoe = [f"{r}{s}" for r in RANKS for s in SUITS] * decks
-    random.shuffle(shoe)
-    # burn 1 card
-    if shoe:
-        shoe.pop()
+def make_shoe(decks: int = 6, seed: Optional[int] = None) -> List[int]:
+    rng = _RNG if seed is None else random.Random(seed)
+    cards = CARDS_INT * decks
+    # shuffled copy with 1 card burned
+    return rng.sample(cards, max(len(cards) - 1, 0))
+
+
+def resume_shoe(seed: Optional[int], cards_drawn: int) -> List[int]:
+    """Rebuild a hand's shoe from its seed, minus the cards already dealt"""
+    shoe = make_shoe(seed=seed)
+    # draw() pops from the end
+    del shoe[max(len(shoe) - cards_drawn, 0):]
     return shoe
 
 
-def draw(shoe: List[str]) -> str:
+def draw(shoe: List[int]) -> str:
     if not shoe:
         # reshuffle new shoe if exhausted
         shoe.extend(make_shoe())
-    return shoe.pop()
+    return INT_TO_CARD[shoe.pop()]
 
 
 class BlackjackStart(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str
     bet: int = Field(..., ge=1, le=1000)
 
 
 @app.post("/api/blackjack/start")
-def blackjack_start(req: BlackjackStart):
+async def blackjack_start(req: BlackjackStart):
+    # active-hand and balance checks are independent reads, run them together
+    existing, balance = await asyncio.gather(
+        HANDS.find_one({"username": req.username, "status": "player_turn"}),
+        get_balance(req.username),
+    )
     # ensure no other active hand
-    hand_col = collection("blackjackhand")
-    existing = hand_col.find_one({"username": req.username, "status": "player_turn"})
     if existing:
         raise HTTPException(status_code=400, detail="Finish your current hand first")
     # balance check
-    if get_balance(req.username) < req.bet:
+    if balance < req.bet:
         raise HTTPException(status_code=400, detail="Insufficient balance")
 
-    shoe = make_shoe()
+    # only the seed is persisted; later actions replay the shoe from it
+    seed = secrets.randbits(63)
+    shoe = make_shoe(seed=seed)
     player_cards = [draw(shoe), draw(shoe)]
     dealer_cards = [draw(shoe), draw(shoe)]
 
@@ -183,58 +382,78 @@ def blackjack_start(req: BlackjackStart):
         else:
             outcome = "push"
             payout = 0
-        new_balance = adjust_balance(req.username, payout)
-        create_document("gameresult", GameResult(
-            username=req.username,
-            game="blackjack",
-            bet=req.bet,
-            payout=payout,
-            balance_after=new_balance,
-            details={"player": player_cards, "dealer": dealer_cards, "outcome": outcome, "natural": True}
-        ))
-        return {
+        new_balance = await finalize_game(
+            req.username, "blackjack", req.bet, payout,
+            {"player": player_cards, "dealer": dealer_cards, "outcome": outcome, "natural": True},
+            min_balance=req.bet,
+        )
+        return ORJSONResponse({
             "status": "resolved",
             "player": player_cards,
             "dealer": dealer_cards,
             "outcome": outcome,
             "payout": payout,
             "balance": new_balance
-        }
+        })
 
-    # otherwise create active hand
-    hand = BlackjackHand(
+    # otherwise create active hand (server-built fields, skip validation)
+    hand = BlackjackHand.model_construct(
         username=req.username,
         bet=req.bet,
         player_cards=player_cards,
         dealer_cards=dealer_cards,
-        shoe=shoe,
+        seed=seed,
+        cards_drawn=4,
         status="player_turn",
         can_double=True
     )
-    hand_id = create_document("blackjackhand", hand)
-    return {
+    hand_id = await create_document("blackjackhand", hand)
+    return ORJSONResponse({
         "status": "player_turn",
         "player": player_cards,
         "dealer": dealer_cards,
         "bet": req.bet,
         "can_double": True,
         "hand_id": hand_id
-    }
+    })
 
 
 class BlackjackAction(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str
 
 
-def get_active_hand(username: str):
-    col = collection("blackjackhand")
-    hand = col.find_one({"username": username, "status": "player_turn"})
+async def get_active_hand(username: str):
+    hand = await HANDS.find_one({"username": username, "status": "player_turn"})
     if not hand:
         raise HTTPException(status_code=404, detail="No active hand")
     return hand
 
 
-def resolve_and_record(username: str, bet: int, player_cards: List[str], dealer_cards: List[str]) -> Dict[str, Any]:
+def unchanged_hand(hand: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter matching the hand only if no other action has dealt from it since it was read"""
+    return {"_id": hand["_id"], "status": "player_turn", "cards_drawn": hand.get("cards_drawn")}
+
+
+def compare_hands(p_val: int, d_val: int) -> Tuple[str, int]:
+    """Outcome and payout factor (per unit bet) for final hand values"""
+    if p_val > 21:
+        return "bust", -1
+    elif d_val > 21 or p_val > d_val:
+        return "win", 1
+    elif p_val < d_val:
+        return "lose", -1
+    else:
+        return "push", 0
+
+
+# every reachable (player, dealer) pair of final values, resolved once at import;
+# a player can hit a hard 21 and reach 31, the dealer stops by 26
+BLACKJACK_OUTCOME = {(p, d): compare_hands(p, d) for p in range(4, 32) for d in range(4, 31)}
+
+
+async def resolve_and_record(username: str, bet: int, player_cards: List[str], dealer_cards: List[str], min_balance: int = 0) -> Dict[str, Any]:
     p_val = hand_value(player_cards)
     d_val = hand_value(dealer_cards)
     # Dealer plays to 17, stands on soft 17
@@ -242,134 +461,129 @@ def resolve_and_record(username: str, bet: int, player_cards: List[str], dealer_
         dealer_cards.append(draw([]))  # draw from a fresh card if needed (should not happen). We'll handle properly below.
         d_val = hand_value(dealer_cards)
     # Compare
-    if p_val > 21:
-        outcome = "bust"
-        payout = -bet
-    elif d_val > 21 or p_val > d_val:
-        outcome = "win"
-        payout = bet
-    elif p_val < d_val:
-        outcome = "lose"
-        payout = -bet
-    else:
-        outcome = "push"
-        payout = 0
-    new_balance = adjust_balance(username, payout)
-    create_document("gameresult", GameResult(
-        username=username,
-        game="blackjack",
-        bet=bet,
-        payout=payout,
-        balance_after=new_balance,
-        details={"player": player_cards, "dealer": dealer_cards, "outcome": outcome}
-    ))
-    # mark hand resolved
-    collection("blackjackhand").update_many({"username": username}, {"$set": {"status": "resolved"}})
+    outcome, factor = BLACKJACK_OUTCOME[(p_val, d_val)]
+    payout = bet * factor
+    new_balance = await finalize_game(
+        username, "blackjack", bet, payout,
+        {"player": player_cards, "dealer": dealer_cards, "outcome": outcome},
+        min_balance=min_balance, resolve_hand=True,
+    )
     return {"outcome": outcome, "payout": payout, "balance": new_balance}
 
 
 @app.post("/api/blackjack/hit")
-def blackjack_hit(req: BlackjackAction):
-    col = collection("blackjackhand")
-    hand = get_active_hand(req.username)
-    shoe = hand.get("shoe", [])
+async def blackjack_hit(req: BlackjackAction):
+    hand = await get_active_hand(req.username)
+    shoe = resume_shoe(hand.get("seed"), hand.get("cards_drawn", 0))
     # draw card
-    if not shoe:
-        shoe = make_shoe()
-    card = shoe.pop()
-    player_cards = hand["player_cards"] + [card]
+    card = draw(shoe)
+    # bust resolves immediately
+    bust = hand_value(hand["player_cards"] + [card]) > 21
+    hand = await HANDS.find_one_and_update(
+        unchanged_hand(hand),
+        [{"$set": {
+            "player_cards": {"$concatArrays": ["$player_cards", [card]]},
+            "can_double": False,
+            "cards_drawn": {"$add": [{"$ifNull": ["$cards_drawn", 0]}, 1]},
+            "status": "resolved" if bust else "player_turn",
+        }}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if not hand:
+        raise HTTPException(status_code=409, detail="Hand changed, try again")
+    player_cards = hand["player_cards"]
     dealer_cards = hand["dealer_cards"]
-    p_val = hand_value(player_cards)
 
-    if p_val > 21:
-        # bust resolves immediately
-        col.update_one({"_id": hand["_id"]}, {"$set": {"player_cards": player_cards, "shoe": shoe, "status": "resolved"}})
-        result = resolve_and_record(req.username, int(hand["bet"]), player_cards, dealer_cards)
-        return {"status": "resolved", "player": player_cards, "dealer": dealer_cards, **result}
+    if hand_value(player_cards) > 21:
+        result = await resolve_and_record(req.username, int(hand["bet"]), player_cards, dealer_cards)
+        return ORJSONResponse({"status": "resolved", "player": player_cards, "dealer": dealer_cards, **result})
     else:
-        col.update_one({"_id": hand["_id"]}, {"$set": {"player_cards": player_cards, "shoe": shoe, "can_double": False}})
-        return {"status": "player_turn", "player": player_cards, "dealer": dealer_cards, "bet": hand["bet"], "can_double": False}
+        return ORJSONResponse({"status": "player_turn", "player": player_cards, "dealer": dealer_cards, "bet": hand["bet"], "can_double": False})
 
 
 @app.post("/api/blackjack/stand")
-def blackjack_stand(req: BlackjackAction):
-    col = collection("blackjackhand")
-    hand = get_active_hand(req.username)
-    shoe = hand.get("shoe", [])
+async def blackjack_stand(req: BlackjackAction):
+    hand = await get_active_hand(req.username)
+    shoe = resume_shoe(hand.get("seed"), hand.get("cards_drawn", 0))
     dealer_cards = hand["dealer_cards"]
-    if not shoe:
-        shoe = make_shoe()
+    new_cards: List[str] = []
     # dealer plays to 17 stand on all 17
-    while hand_value(dealer_cards) < 17:
-        dealer_cards.append(shoe.pop())
-        if not shoe:
-            shoe = make_shoe()
-    col.update_one({"_id": hand["_id"]}, {"$set": {"dealer_cards": dealer_cards, "shoe": shoe, "status": "resolved"}})
-    result = resolve_and_record(req.username, int(hand["bet"]), hand["player_cards"], dealer_cards)
-    return {"status": "resolved", "player": hand["player_cards"], "dealer": dealer_cards, **result}
+    while hand_value(dealer_cards + new_cards) < 17:
+        new_cards.append(draw(shoe))
+    hand = await HANDS.find_one_and_update(
+        unchanged_hand(hand),
+        [{"$set": {
+            "dealer_cards": {"$concatArrays": ["$dealer_cards", new_cards]},
+            "cards_drawn": {"$add": [{"$ifNull": ["$cards_drawn", 0]}, len(new_cards)]},
+            "status": "resolved",
+        }}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if not hand:
+        raise HTTPException(status_code=409, detail="Hand changed, try again")
+    dealer_cards = hand["dealer_cards"]
+    result = await resolve_and_record(req.username, int(hand["bet"]), hand["player_cards"], dealer_cards)
+    return ORJSONResponse({"status": "resolved", "player": hand["player_cards"], "dealer": dealer_cards, **result})
 
 
 @app.post("/api/blackjack/double")
-def blackjack_double(req: BlackjackAction):
-    col = collection("blackjackhand")
-    hand = get_active_hand(req.username)
+async def blackjack_double(req: BlackjackAction):
+    hand = await get_active_hand(req.username)
     if not hand.get("can_double", False) or len(hand.get("player_cards", [])) != 2:
         raise HTTPException(status_code=400, detail="Double not allowed now")
-    # check balance can cover doubling
     current_bet = int(hand["bet"])
-    if get_balance(req.username) < current_bet:
-        raise HTTPException(status_code=400, detail="Insufficient balance to double")
 
-    shoe = hand.get("shoe", [])
-    if not shoe:
-        shoe = make_shoe()
+    shoe = resume_shoe(hand.get("seed"), hand.get("cards_drawn", 0))
     # double bet, draw one, then stand and resolve
     current_bet *= 2
-    player_cards = hand["player_cards"] + [shoe.pop()]
+    player_cards = hand["player_cards"] + [draw(shoe)]
     dealer_cards = hand["dealer_cards"]
+    dealt = len(dealer_cards)
 
     # Dealer plays
     while hand_value(dealer_cards) < 17:
-        if not shoe:
-            shoe = make_shoe()
-        dealer_cards.append(shoe.pop())
+        dealer_cards.append(draw(shoe))
 
+    # claim the hand so a racing action can't settle it too
+    claimed = await HANDS.find_one_and_update(unchanged_hand(hand), {"$set": {"status": "dealer_turn"}})
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Hand changed, try again")
+    try:
+        # the balance update only applies if it can cover doubling (original bet)
+        result = await resolve_and_record(req.username, current_bet, player_cards, dealer_cards, min_balance=int(hand["bet"]))
+    except HTTPException:
+        # nothing was settled; hand the turn back to the player
+        await HANDS.update_one({"_id": hand["_id"], "status": "dealer_turn"}, {"$set": {"status": "player_turn"}})
+        raise
     # save resolution
-    col.update_one({"_id": hand["_id"]}, {"$set": {"player_cards": player_cards, "dealer_cards": dealer_cards, "shoe": shoe, "status": "resolved"}})
-    result = resolve_and_record(req.username, current_bet, player_cards, dealer_cards)
-    return {"status": "resolved", "player": player_cards, "dealer": dealer_cards, **result}
+    await HANDS.update_one({"_id": hand["_id"]}, {"$set": {"player_cards": player_cards, "dealer_cards": dealer_cards, "status": "resolved"}, "$inc": {"cards_drawn": 1 + len(dealer_cards) - dealt}})
+    return ORJSONResponse({"status": "resolved", "player": player_cards, "dealer": dealer_cards, **result})
 
 
 # ----- Slots (simple for now) -----
 
 symbols = ["🍒","🍋","🔔","⭐","7️⃣","🍀"]
 weights = [30, 25, 20, 15, 7, 3]
+CUM_WEIGHTS = list(itertools.accumulate(weights))
+# reels are drawn and compared as indexes into symbols; names are only needed for the response
+SYMBOL_IDX = range(len(symbols))
 
 @app.post("/api/slots/spin")
-def spin_slots(req: BetRequest):
-    reels = []
-    for _ in range(3):
-        reels.append(random.choices(symbols, weights=weights, k=1)[0])
+async def spin_slots(req: BetRequest):
+    a, b, c = _RNG.choices(SYMBOL_IDX, cum_weights=CUM_WEIGHTS, k=3)
+    reels = [symbols[a], symbols[b], symbols[c]]
     payout = 0
     outcome = "lose"
-    if len(set(reels)) == 1:
+    if a == b == c:
         outcome = "jackpot"
         payout = req.bet * 10
-    elif reels[0] == reels[1] or reels[1] == reels[2] or reels[0] == reels[2]:
+    elif a == b or b == c or a == c:
         outcome = "win"
         payout = req.bet * 2
     else:
         payout = -req.bet
-    new_balance = adjust_balance(req.username, payout)
-    create_document("gameresult", GameResult(
-        username=req.username,
-        game="slots",
-        bet=req.bet,
-        payout=payout,
-        balance_after=new_balance,
-        details={"reels": reels, "outcome": outcome}
-    ))
-    return {"reels": reels, "outcome": outcome, "payout": payout, "balance": new_balance}
+    new_balance = await finalize_game(req.username, "slots", req.bet, payout, {"reels": reels, "outcome": outcome})
+    return ORJSONResponse({"reels": reels, "outcome": outcome, "payout": payout, "balance": new_balance})
 
 # ----- Baccarat (same as before simplified rules) -----
 
@@ -378,12 +592,12 @@ card_values = {
 }
 
 
-def draw_rank():
-    ranks = ["A","2","3","4","5","6","7","8","9","10","J","Q","K"]
-    return random.choice(ranks)
+RANKS_TUPLE = tuple(RANKS)
 
 
 class BaccaratBet(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     username: str
     bet: int = Field(..., ge=1, le=1000)
     side: Literal["player","banker","tie"]
@@ -394,9 +608,11 @@ def hand_total(cards):
 
 
 @app.post("/api/baccarat/play")
-def play_baccarat(req: BaccaratBet):
-    player = [draw_rank(), draw_rank()]
-    banker = [draw_rank(), draw_rank()]
+async def play_baccarat(req: BaccaratBet):
+    # every card the hand could need, drawn in one call
+    draws = _RNG.choices(RANKS_TUPLE, k=6)
+    player = draws[0:2]
+    banker = draws[2:4]
     player_total = hand_total(player)
     banker_total = hand_total(banker)
 
@@ -406,10 +622,10 @@ def play_baccarat(req: BaccaratBet):
     else:
         # draw rules simplified: if player <=5 draw one, banker mirrors
         if player_total <= 5:
-            player.append(draw_rank())
+            player.append(draws[4])
             player_total = hand_total(player)
         if banker_total <= 5:
-            banker.append(draw_rank())
+            banker.append(draws[5])
             banker_total = hand_total(banker)
 
     outcome = "tie"
@@ -431,26 +647,21 @@ def play_baccarat(req: BaccaratBet):
     else:
         payout = -req.bet
 
-    new_balance = adjust_balance(req.username, payout)
-    create_document("gameresult", GameResult(
-        username=req.username,
-        game="baccarat",
-        bet=req.bet,
-        payout=payout,
-        balance_after=new_balance,
-        details={"player": player, "banker": banker, "result": outcome}
-    ))
-    return {"player": player, "banker": banker, "result": outcome, "payout": payout, "balance": new_balance}
+    new_balance = await finalize_game(req.username, "baccarat", req.bet, payout, {"player": player, "banker": banker, "result": outcome})
+    return ORJSONResponse({"player": player, "banker": banker, "result": outcome, "payout": payout, "balance": new_balance})
 
 # History endpoint
 
 @app.get("/api/history/{username}")
-def history(username: str):
-    col = collection("gameresult")
-    docs = list(col.find({"username": username}).sort("created_at", -1).limit(20))
-    for d in docs:
-        d["_id"] = str(d["_id"])  # serialize
-    return docs
+async def history(username: str):
+    pipeline = [
+        {"$match": {"username": username}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": 20},
+        {"$addFields": {"_id": {"$toString": "$_id"}}},  # serialize server-side
+    ]
+    # returned as a response so datetimes go straight to orjson, skipping jsonable_encoder
+    return ORJSONResponse(await GAMERESULTS.aggregate(pipeline).to_list(20))
 
 if __name__ == "__main__":
     import uvicorn
@@ -11,7 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Literal, Dict, Any, List
 
 # Example schemas (kept for reference)
@@ -45,6 +45,8 @@ class Player(BaseModel):
     Players collection schema
     Collection name: "player"
     """
+    model_config = ConfigDict(frozen=True)
+
     username: str = Field(..., min_length=3, max_length=24, description="Unique username")
     balance: int = Field(1000, ge=0, description="Play credits (no real money)")
 
@@ -69,7 +71,8 @@ class BlackjackHand(BaseModel):
     bet: int = Field(..., ge=1, le=1000)
     player_cards: List[str]
     dealer_cards: List[str]
-    shoe: List[str] = Field(default_factory=list)
+    seed: int = Field(..., description="Shoe shuffle seed; the shoe is rebuilt from it on each action")
+    cards_drawn: int = Field(0, ge=0)
     status: Literal["player_turn", "dealer_turn", "resolved"] = "player_turn"
     outcome: Optional[Literal["win", "lose", "push", "blackjack", "bust"]] = None
     payout: Optional[int] = None